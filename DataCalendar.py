@@ -4,6 +4,7 @@ import pandas as pd
 import calendar
 import datetime
 import os
+from profiling import span
 
 # utility to strip ANSI escape codes
 # thanks https://stackoverflow.com/a/14889588
@@ -24,6 +25,12 @@ class DataCalendar(calendar.TextCalendar):
     # takes dict with ISO dates as keys and corresponding data as values
     # returns string containing text calendar with dates filled with data
     def formatdata(self, data_dict, visualize):
+        # time each render when profiling is on
+        name = f'calendar.{getattr(visualize, "__name__", "formatdata")}'
+        with span(name, rows=len(data_dict)):
+            return self._formatdata(data_dict, visualize)
+
+    def _formatdata(self, data_dict, visualize):
         # start output string
         out = ''
 
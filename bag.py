@@ -1,5 +1,7 @@
 #!/usr/bin/python3
 
+import profiling # first, to time imports
+from profiling import span
 import yaml
 import os
 import pandas as pd
@@ -9,12 +11,14 @@ try:
     import gnureadline as readline
 except ImportError:
     import readline
-import re
 from tab_completer import tab_completer
 import argparse
 import config
 from sync import sync
 import subprocess
+import sqlite3
+from query_index import query, format_table
+from survey_data import load_data, save_data, build_options, past_key_values
 
 
 parser = argparse.ArgumentParser(
@@ -24,6 +28,7 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
         dest='survey',
         metavar='survey_name',
+        nargs='?',
         help=f'survey name, refers to survey defined in {config.path}/surveys/<survey_name>.yaml')
 parser.add_argument(
         '-e', '--editor',
@@ -63,9 +68,55 @@ parser.add_argument(
         type=str,
         help='file to read autofill values from, useful for automating entries',
 )
+parser.add_argument(
+        '--query',
+        action='store',
+        type=str,
+        metavar='SQL',
+        help='run SQL query against an index of all survey data files and exit; each survey is a table named after it, with key-value answers exploded into <survey_name>_kv. No survey_name needed.'
+)
+parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='print a table of time spent in each phase (startup, loading, option building, writing, syncing) on exit; also enabled by setting $MEATBAG_PROFILE to 1.'
+)
+parser.add_argument(
+        '--profile-log',
+        action='store',
+        type=str,
+        metavar='FILE',
+        help='append time spent in each phase to FILE as a json line on exit; also enabled by setting $MEATBAG_PROFILE to a file path.'
+)
+parser.add_argument(
+        '--profile-dump',
+        action='store',
+        type=str,
+        metavar='FILE',
+        help='dump cProfile stats for the whole run, imports included, to FILE on exit; also enabled by setting $MEATBAG_PROFILE_DUMP to a file path.'
+)
 
 args = parser.parse_args()
 
+if args.profile or args.profile_log or args.profile_dump:
+    profiling.enable(
+            print_summary=args.profile,
+            log=args.profile_log,
+            dump=args.profile_dump,
+    )
+profiling.record('startup', profiling.start)
+
+if args.query:
+    try:
+        with span('query'):
+            result = query(args.query)
+        print(format_table(*result))
+    except sqlite3.Error as e:
+        print('query failed:\n'+str(e))
+    raise SystemExit
+
+if args.survey is None:
+    parser.error('survey_name is required')
+
 if args.sync:
     print('syncing ... ', end='', flush=True)
     try:
@@ -104,30 +155,14 @@ if args.tail:
 # load survey
 survey_path = f'{config.path}/surveys/{args.survey}.yaml'
 assert os.path.isfile(survey_path), f'survey not found at {survey_path}'
-with open(survey_path, 'r') as f:
+with span('load survey'), open(survey_path, 'r') as f:
     spec = yaml.load(f, Loader=yaml.SafeLoader)
 
 # load data
 data_path = f'{config.path}/data/{args.survey}.csv'
-try:
-    data = pd.read_csv(
-            data_path,
-            dtype=str, # use str datatype to avoid type inference changing things
-            na_values=[],
-            keep_default_na=False
-    )
-except FileNotFoundError:
-    empty_data = {k:[] for k in spec['questions'].keys()}
-    data = pd.DataFrame(empty_data).astype(str)
-
-# check if there are new questions
-for q in spec['questions'].keys():
-    if q not in data:
-        data[q] = ['' for _ in range(data.shape[0])]
-# check if there are date/time columns
-for q in ['date', 'time']:
-    if q not in data:
-        data[q] = [None for _ in range(data.shape[0])]
+with span('load data') as s:
+    data = load_data(data_path, spec)
+    s.rows = len(data)
 
 # list of questions
 questions = spec['questions'].items()
@@ -181,38 +216,12 @@ else:
 
             # Look at top level of survey spec for a default option set
             option_spec = question.get('options', spec.get('default_options', ''))
-            # check for __past_n__ option
-            past_n = next(
-                        filter(
-                            lambda s: re.match(r'__past_\d+__', s),
-                            option_spec),
-                        None)
-            # list past answers as options
-            if '__past__' in option_spec:
-                options = data[name].iloc[::-1].unique()
+            with span(f'options.{name}') as s:
+                options = build_options(data, name, option_spec)
+                s.rows = len(options)
+            # print options if spec lists any
+            if len(option_spec) > 0:
                 print('  (' + ' | '.join(map(str, options)) + ')')
-            # or answers from past n days
-            elif past_n and not data.empty: # empty data breaks .loc line
-                # NB past_n = '__past_XX__' for some digits XX
-                # so past_n.split('_') = ['', '', 'past', 'XX', '', '']
-                n = int(past_n.split('_')[3])
-                cutoff = datetime.date.today() - datetime.timedelta(days=n)
-                past_n_rows = data.loc[data['date'] > cutoff.isoformat()]
-                options = past_n_rows[name].iloc[::-1].unique()
-                print('  (' + ' | '.join(map(str, options)) + ')')
-            # or past words
-            elif '__past_words__' in option_spec:
-                options = data[name].iloc[::-1]
-                options = ' '.join(options).split()
-                options = pd.unique(options)
-                print('  (' + ' | '.join(map(str, options)) + ')')
-            # or specified options
-            elif len(option_spec) > 0:
-                # ignore double underscored options
-                options = [op for op in option_spec if '__' not in op]
-                print('  (' + ' | '.join(options) + ')')
-            else:
-                options = []
             
             # set default input
             default = ''
@@ -223,10 +232,11 @@ else:
             if 'key-value' in question:
                 response = {}
                 # get past keys and values
-                past_dicts = [json.loads(s) for s in data[name] if s]
-                past_df = pd.DataFrame(past_dicts)
-                keys = past_df.columns
-                key_completer = tab_completer(keys)
+                with span(f'options.{name}.key-value') as s:
+                    past_df = past_key_values(data, name)
+                    keys = past_df.columns
+                    key_completer = tab_completer(keys)
+                    s.rows = len(past_df)
                 readline.set_completer(key_completer)
                 key = input('key: > ')
                 while key != 'q' and key != '':
@@ -270,11 +280,13 @@ else:
 
 
 
-if replace_data:
-    data.drop(idx, axis=0, inplace=True)
-new_row = pd.DataFrame(row, index=[0]).astype(str)
-data = pd.concat((data, new_row), ignore_index=True)
-data.to_csv(data_path, index=False)
+with span('write') as s:
+    if replace_data:
+        data.drop(idx, axis=0, inplace=True)
+    new_row = pd.DataFrame(row, index=[0]).astype(str)
+    data = pd.concat((data, new_row), ignore_index=True)
+    save_data(data, data_path)
+    s.rows = len(data)
 
 # sync with remote if configured
 if config.remote:
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+
+import yaml
+import json
+import random
+import datetime
+import argparse
+import pandas as pd
+
+# generate synthetic survey data from a survey spec like surveys/test.yaml
+#
+#   questions may carry an optional `sample` key, ignored by bag, to say what
+#   answers to generate: either a list of answers to pick from, or `number`
+#   otherwise answers are picked from listed options, words (for
+#   __past_words__), or a vocabulary of short phrases; key-value questions get
+#   json objects of a few task keys
+
+WORDS = [
+        'calm', 'focused', 'energetic', 'tired', 'anxious', 'content',
+        'restless', 'cheerful', 'grumpy', 'curious', 'sleepy', 'bright',
+        'heavy', 'light', 'scattered', 'steady', 'hungry', 'social',
+        'quiet', 'loud', 'golden', 'peacock', 'boat', 'captain',
+        'oolong', 'sencha', 'darjeeling', 'assam', 'rooibos', 'chai',
+        'hill', 'loop', 'commute', 'later', 'lots', 'rain',
+]
+KEYS = [f'task{i}' for i in range(25)]
+
+# make one answer for a question
+def sample(question, rng, phrases):
+    hint = question.get('sample')
+    options = [op for op in question.get('options') or [] if '__' not in op]
+    if hint == 'number':
+        return f'{rng.uniform(1, 200):.2f}'
+    elif isinstance(hint, list):
+        return str(rng.choice(hint))
+    elif 'key-value' in question:
+        keys = rng.sample(KEYS, rng.randint(0, 3))
+        return json.dumps({k: f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}' for k in keys})
+    elif options:
+        return rng.choice(options)
+    elif '__past_words__' in (question.get('options') or []):
+        return ' '.join(rng.sample(WORDS, rng.randint(1, 4)))
+    else:
+        return rng.choice(phrases)
+
+# generate `rows` rows spread over the `days` days up to today, as str dataframe
+def generate(spec, rows, days=None, seed=0):
+    rng = random.Random(seed)
+    days = days or min(rows, 365*2)
+    phrases = [' '.join(rng.sample(WORDS, rng.randint(1, 2))) for _ in range(200)]
+    questions = spec['questions'] or {}
+
+    data = {name: [] for name in questions}
+    data['date'] = []
+    data['time'] = []
+    first = datetime.date.today() - datetime.timedelta(days=days-1)
+    for i in range(rows):
+        for name, question in questions.items():
+            data[name].append(sample(question or {}, rng, phrases))
+        # rows in order, roughly rows/days per day at increasing times
+        day = i*days // rows
+        data['date'].append((first + datetime.timedelta(days=day)).isoformat())
+        minute = (i*days % rows) * 24*60 // rows
+        data['time'].append(f'{minute // 60:02d}:{minute % 60:02d}')
+
+    return pd.DataFrame(data).astype(str)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description='generate a synthetic survey data file from a survey spec.',
+    )
+    parser.add_argument('spec', help='path to survey spec yaml')
+    parser.add_argument('rows', type=int, help='number of rows to generate')
+    parser.add_argument('-o', '--output', required=True, help='path to write csv')
+    parser.add_argument('--days', type=int, help='number of days to spread rows over, default min(rows, 730)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as f:
+        spec = yaml.load(f, Loader=yaml.SafeLoader)
+    data = generate(spec, args.rows, days=args.days, seed=args.seed)
+    data.to_csv(args.output, index=False)
@@ -0,0 +1,291 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import yaml
+
+# benchmark hot paths of meatbag-UX on synthetic surveys
+#
+#   runs in a scratch directory with its own config.py, so needs no TTY,
+#   no network and no real data; sync uses a local directory as the rclone
+#   remote, and is skipped if rclone is not installed; peak memory is only
+#   measured with --memory, since the traced run is much slower than the rest
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(bench_dir)
+
+parser = argparse.ArgumentParser(
+        description='benchmark load, prompt, sync, calendar and budget paths on synthetic surveys.',
+)
+parser.add_argument(
+        '-n', '--rows',
+        nargs='+',
+        type=int,
+        default=[1000, 10000, 100000],
+        help='survey sizes to benchmark, in rows.'
+)
+parser.add_argument(
+        '--spec',
+        default=f'{repo_dir}/surveys/test.yaml',
+        help='survey spec to generate data from for load, prompt, sync and calendar paths.'
+)
+parser.add_argument(
+        '--money-spec',
+        default=f'{bench_dir}/surveys/money.yaml',
+        help='survey spec to generate data from for autopay and budget paths; needs description, amount, io, category and subcategory questions.'
+)
+parser.add_argument(
+        '-r', '--repeat',
+        type=int,
+        default=3,
+        help='timed runs per benchmark; the fastest is recorded.'
+)
+parser.add_argument(
+        '-k', '--only',
+        help='only run benchmarks whose name contains this string.'
+)
+parser.add_argument(
+        '-o', '--output',
+        help='path to write results json.'
+)
+parser.add_argument(
+        '-b', '--baseline',
+        help='results json from an earlier run to compare against; exits with status 1 on regression.'
+)
+parser.add_argument(
+        '--threshold',
+        type=float,
+        default=1.25,
+        help='ratio to baseline time or peak memory above which a benchmark counts as a regression.'
+)
+parser.add_argument(
+        '-m', '--memory',
+        action='store_true',
+        help='also record peak memory, from one extra run under tracemalloc; this run is several times slower than the timed ones and dominates total runtime.'
+)
+
+# without a TTY readline's line buffer is always empty, so tab_completer would
+# match every option whatever the prefix; stand in for readline with the line
+# being "typed"
+class TypedLine:
+    line = ''
+
+    def get_line_buffer(self):
+        return self.line
+
+typed = TypedLine()
+
+# write config pointing at scratch directory, and import repo modules with it
+# ahead of any real config.py
+def import_repo(workdir):
+    global generate, load_data, save_data, build_options, past_key_values
+    global tab_completer, sync, merge, DataCalendar, find_unpaid, totals, pd
+    for d in ['data', 'remote', 'autopay']:
+        os.mkdir(f'{workdir}/{d}')
+    with open(f'{workdir}/config.py', 'w') as f:
+        f.write(f"path = {workdir!r}\n")
+        f.write(f"autopay_path = {workdir + '/autopay'!r}\n")
+        f.write(f"remote = {workdir + '/remote'!r}\n")
+    sys.path[:0] = [workdir, repo_dir]
+
+    from generate import generate
+    from survey_data import load_data, save_data, build_options, past_key_values
+    import tab_completer as completion
+    from tab_completer import tab_completer
+    from sync import sync, merge
+    from DataCalendar import DataCalendar
+    from autopay import find_unpaid
+    from budget import totals
+    import pandas as pd
+    completion.readline = typed
+
+# time fastest of `repeat` runs of fn, and optionally peak traced memory of
+# one more run
+def measure(fn, repeat, setup=None, memory=False):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'time': min(times), 'peak': peak}
+
+# first question in spec whose options satisfy `test`
+def find_question(spec, test):
+    for name, question in spec['questions'].items():
+        question = question or {}
+        if test(question, question.get('options') or []):
+            return name, question
+    return None, None
+
+# benchmarks for one survey size, as dict of name -> (fn, setup)
+def benchmarks(workdir, n, spec, money_spec):
+    survey_path = f'{workdir}/data/bench.csv'
+    data = generate(spec, n)
+    save_data(data, survey_path)
+    data = load_data(survey_path, spec)
+
+    benches = {}
+    benches['load'] = (lambda: load_data(survey_path, spec), None)
+    benches['save'] = (lambda: save_data(data, f'{workdir}/data/save.csv'), None)
+
+    # option building and tab completion
+    kinds = {
+            '__past__': lambda q, ops: '__past__' in ops,
+            '__past_words__': lambda q, ops: '__past_words__' in ops,
+            'options': lambda q, ops: ops and all('__' not in op for op in ops),
+    }
+    for kind, test in kinds.items():
+        name, question = find_question(spec, test)
+        if name:
+            option_spec = question['options']
+            benches[f'options.{kind}'] = (lambda name=name, option_spec=option_spec: build_options(data, name, option_spec), None)
+    name, _ = find_question(spec, lambda q, ops: '__past__' in ops)
+    if name:
+        benches['options.__past_30__'] = (lambda name=name: build_options(data, name, ['__past_30__']), None)
+        options = build_options(data, name, ['__past__'])
+        # type the first half of each option, completing its last word
+        lines = [op[:max(1, len(op)//2)] for op in options if isinstance(op, str) and op]
+        def complete():
+            completer = tab_completer(options)
+            for line in lines:
+                typed.line = line
+                text = line[line.rfind(' ')+1:]
+                state = 0
+                while completer(text, state) is not None:
+                    state += 1
+        benches['tab_completer'] = (complete, None)
+    kv_name, _ = find_question(spec, lambda q, ops: 'key-value' in q)
+    if kv_name:
+        def key_values():
+            past_df = past_key_values(data, kv_name)
+            tab_completer(past_df.columns)
+            for key in past_df.columns:
+                tab_completer(past_df.get(key, []))
+        benches['options.key-value'] = (key_values, None)
+
+    # sync, with remote holding rows local lacks and vice versa
+    local_data = data.iloc[:n - n//100]
+    remote_data = data.iloc[n//100:]
+    benches['sync.merge'] = (lambda: merge(local_data, remote_data), None)
+    if shutil.which('rclone'):
+        local_copy = f'{workdir}/sync_local.csv'
+        remote_copy = f'{workdir}/sync_remote.csv'
+        local_data.to_csv(local_copy, index=False)
+        remote_data.to_csv(remote_copy, index=False)
+        def reset():
+            shutil.copy(local_copy, f'{workdir}/data/bench.csv')
+            shutil.copy(remote_copy, f'{workdir}/remote/bench.csv')
+        benches['sync'] = (lambda: sync('bench'), reset)
+
+    # calendar of rows per day, with each visualizer
+    counts = data.groupby('date').size().to_dict()
+    cal = DataCalendar()
+    for vis in ['identity', 'truth_blocks', 'value_blocks', 'log_value_blocks', 'color_blocks', 'log_color_blocks']:
+        benches[f'calendar.{vis}'] = (lambda vis=vis: cal.formatdata(counts, getattr(cal, vis)), None)
+
+    # autopay and budget, on money survey loaded as those scripts do
+    money_path = f'{workdir}/data/money.csv'
+    save_data(generate(money_spec, n), money_path)
+    money = pd.read_csv(money_path)
+    first = money.iloc[0]
+    bills = [{
+                'description': description,
+                'category': first['category'],
+                'subcategory': first['subcategory'],
+                'amount': '100.00',
+                'date': first['date'],
+            } for description in money['description'].unique()[:5]]
+    benches['autopay'] = (lambda: find_unpaid(bills, money), None)
+    benches['budget'] = (lambda: totals(money, first['date']), None)
+
+    return benches
+
+# compare results to baseline, returning names of regressed benchmarks;
+# ignores changes smaller than a millisecond or a MiB, which are mostly noise
+def compare(results, baseline, threshold):
+    noise = {'time': 1e-3, 'peak': 2**20}
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ['time', 'peak']:
+            before = baseline[name].get(metric)
+            if result[metric] is None or before is None:
+                continue
+            if result[metric] > threshold * before and result[metric] - before > noise[metric]:
+                regressions.append(name)
+                break
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+    with open(args.spec, 'r') as f:
+        spec = yaml.load(f, Loader=yaml.SafeLoader)
+    with open(args.money_spec, 'r') as f:
+        money_spec = yaml.load(f, Loader=yaml.SafeLoader)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='meatbag-bench-')
+    try:
+        import_repo(workdir)
+        for n in args.rows:
+            for name, (fn, setup) in benchmarks(workdir, n, spec, money_spec).items():
+                name = f'{name}/{n}'
+                if args.only and args.only not in name:
+                    continue
+                results[name] = measure(fn, args.repeat, setup, memory=args.memory)
+                # print as we go, since large sizes take a while
+                ratio = ''
+                if name in baseline and baseline[name]['time']:
+                    ratio = f"{results[name]['time'] / baseline[name]['time']:8.2f}x"
+                peak = ''
+                if results[name]['peak'] is not None:
+                    peak = f"{results[name]['peak']/2**20:10.1f} MiB"
+                print(f"{name:40} {results[name]['time']:10.4f} s {peak} {ratio}", flush=True)
+    finally:
+        shutil.rmtree(workdir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                    'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'pandas': pd.__version__,
+                    'platform': platform.platform(),
+                    'repeat': args.repeat,
+                    'results': results,
+                }, f, indent=4)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\nregressed more than {args.threshold}x against baseline:')
+        for name in regressions:
+            print(f'  {name}')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,22 +7,29 @@ import config
 money_bag = f'{config.path}/data/money.csv' # path to money survey
 start_date = '2024-04-01' # ISO format---only take entries starting from this date
 
-data = pd.read_csv(money_bag)
-data = data.loc[data['date'] >= start_date]
+# sum amounts in, out and saved since start date
+def totals(data, start_date):
+    data = data.loc[data['date'] >= start_date]
 
-income = data.loc[data['io'] == 'in', 'amount'].sum()
-spent = data.loc[data['io'] == 'out', 'amount'].sum()
-saved = data.loc[data['io'] == 'save', 'amount'].sum()
+    income = data.loc[data['io'] == 'in', 'amount'].sum()
+    spent = data.loc[data['io'] == 'out', 'amount'].sum()
+    saved = data.loc[data['io'] == 'save', 'amount'].sum()
 
-balance = income - spent - saved
+    return income, spent, saved
 
-color = '\033[31m' if balance < 0 else '\033[0m'
-sign = '-' if balance < 0 else '+'
+if __name__ == '__main__':
+    data = pd.read_csv(money_bag)
+    income, spent, saved = totals(data, start_date)
 
-# pretty formatting for start date
-d = datetime.date.fromisoformat(start_date)
-d = d.strftime('%B ') + str(int(d.strftime('%d'))) + d.strftime(', %Y') # str(int( )) to remove potential leading 0 on day
-print(f"""
+    balance = income - spent - saved
+
+    color = '\033[31m' if balance < 0 else '\033[0m'
+    sign = '-' if balance < 0 else '+'
+
+    # pretty formatting for start date
+    d = datetime.date.fromisoformat(start_date)
+    d = d.strftime('%B ') + str(int(d.strftime('%d'))) + d.strftime(', %Y') # str(int( )) to remove potential leading 0 on day
+    print(f"""
 Balanced budget from {d}
 
 Income:  + ${income: 10.2f}
@@ -31,4 +38,3 @@ Saved:    (${saved: 10.2f})
 ---------------------------------
 Balance: {color}{sign} ${abs(balance): 10.2f}\033[0m
 """)
-
@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import json
+import atexit
+import datetime
+import functools
+
+# opt-in timing instrumentation
+#
+#   code marks phases with `with span('name') as s:` (optionally setting
+#   `s.rows`), or decorates functions with `@timed('name')`; while disabled
+#   these do nothing beyond a flag check
+#
+#   enabled by `bag --profile` / `--profile-log` / `--profile-dump`, or by
+#   setting MEATBAG_PROFILE to `1`/`true`/`yes`/`on` (print summary table) or
+#   to a file path (append a json line per run; `0`/`false`/`no`/`off` and
+#   empty mean disabled), and MEATBAG_PROFILE_DUMP to a file path (dump
+#   cProfile stats, readable with pstats or snakeviz)
+#
+#   bag's --profile-dump is picked up from sys.argv when this module is
+#   imported, so like MEATBAG_PROFILE_DUMP it covers the rest of the imports
+
+# time this module was imported; bag imports it first, so this is ~ startup
+start = time.perf_counter()
+
+enabled = False
+spans = [] # (name, seconds, rows)
+summary = False
+log_path = None
+dump_path = None
+profiler = None
+
+class Span:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans.append((self.name, time.perf_counter() - self.start, self.rows))
+
+# stand-in returned while disabled; accepts and ignores `rows`
+class NullSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+null_span = NullSpan()
+
+def span(name, rows=None):
+    if not enabled:
+        return null_span
+    return Span(name, rows)
+
+# record span that started at perf_counter time `since` and ends now
+def record(name, since, rows=None):
+    if enabled:
+        spans.append((name, time.perf_counter() - since, rows))
+
+# decorator timing each call of a function as a span
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# turn on instrumentation, reporting at exit
+def enable(print_summary=False, log=None, dump=None):
+    global enabled, summary, log_path, dump_path, profiler
+    summary = summary or print_summary
+    log_path = log_path or log
+    if dump and not profiler:
+        import cProfile
+        dump_path = dump
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if not enabled:
+        enabled = True
+        atexit.register(report)
+
+# format spans as table, aggregated by name in order of first appearance
+def format_summary():
+    totals = {}
+    for name, seconds, rows in spans:
+        calls, total, total_rows = totals.get(name, (0, 0, None))
+        if rows is not None:
+            total_rows = (total_rows or 0) + rows
+        totals[name] = (calls+1, total+seconds, total_rows)
+    width = max([len(name) for name in totals] + [4])
+    lines = [f'{"span".ljust(width)}  {"calls":>6}  {"total s":>10}  {"mean s":>10}  {"rows":>10}']
+    lines.append('-'*len(lines[0]))
+    for name, (calls, total, rows) in totals.items():
+        rows = '' if rows is None else rows
+        lines.append(f'{name.ljust(width)}  {calls:>6}  {total:>10.4f}  {total/calls:>10.4f}  {rows:>10}')
+    return '\n'.join(lines)
+
+def report():
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(dump_path)
+    if summary:
+        print('\n' + format_summary(), file=sys.stderr)
+    if log_path:
+        with open(log_path, 'a') as f:
+            f.write(json.dumps({
+                    'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                    'argv': sys.argv,
+                    'spans': [{'name': n, 'seconds': s, 'rows': r} for n, s, r in spans],
+                }) + '\n')
+
+# value of bag's --profile-dump option, if given, read before argparse runs
+def argv_dump():
+    if os.path.basename(sys.argv[0]) not in ['bag', 'bag.py']:
+        return None
+    for i, arg in enumerate(sys.argv[1:], start=1):
+        if arg == '--profile-dump' and i+1 < len(sys.argv):
+            return sys.argv[i+1]
+        if arg.startswith('--profile-dump='):
+            return arg.split('=', 1)[1]
+    return None
+
+# enable from environment, and start cProfile as early as possible
+env = os.getenv('MEATBAG_PROFILE', '')
+if env.lower() in ['1', 'true', 'yes', 'on']:
+    enable(print_summary=True)
+elif env.lower() not in ['', '0', 'false', 'no', 'off']:
+    enable(log=env)
+dump = argv_dump() or os.getenv('MEATBAG_PROFILE_DUMP')
+if dump:
+    enable(dump=dump)
@@ -0,0 +1,232 @@
+import sqlite3
+import csv
+import sys
+import glob
+import json
+import hashlib
+import os
+import config
+
+# SQLite mirror of all survey data files, for ad-hoc queries across surveys
+#
+#   one table per survey, named after the survey, with the csv columns as text
+#       plus `_row` (1-based row number in the csv), and an index on `date`
+#   key-value answers (json objects) exploded into `<survey>_kv` with columns
+#       `_row`, `question`, `key`, `value`
+#   names starting with `__meatbag` are reserved for bookkeeping
+#
+# refreshed incrementally: a file with unchanged size/mtime is skipped, a file
+# that only had rows appended (same hash of everything up to the last ingested
+# byte offset) is read from that offset, and anything else is reloaded
+
+index_path = f'{config.path}/data/.index.sqlite'
+
+RESERVED = '__meatbag'
+FILES_TABLE = f'{RESERVED}_files'
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def connect():
+    con = sqlite3.connect(index_path)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FILES_TABLE} (
+            survey TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            offset INTEGER,
+            hash TEXT,
+            header TEXT,
+            rows INTEGER
+        )""")
+    return con
+
+
+# column names for a csv header: sqlite column names are case-insensitive and
+# must be unique, and `_row` is ours, so clashing names get `_` appended
+def column_names(header):
+    seen = {'_row'}
+    columns = []
+    for c in header:
+        while c.lower() in seen:
+            c += '_'
+        seen.add(c.lower())
+        columns.append(c)
+    return columns
+
+
+# drop and recreate tables for a survey with the given csv header
+def create_tables(con, survey, header):
+    table = quote(survey)
+    kv_table = quote(f'{survey}_kv')
+    con.execute(f'DROP TABLE IF EXISTS {table}')
+    con.execute(f'DROP TABLE IF EXISTS {kv_table}')
+    columns = column_names(header)
+    # an empty csv has no header, and gets a table with just `_row`
+    definitions = ['_row INTEGER PRIMARY KEY'] + [f'{quote(c)} TEXT' for c in columns]
+    con.execute(f'CREATE TABLE {table} ({", ".join(definitions)})')
+    if 'date' in columns:
+        con.execute(f'CREATE INDEX {quote(f"{RESERVED}_index_{survey}_date")} ON {table} (date)')
+    con.execute(f"""
+        CREATE TABLE {kv_table} (
+            _row INTEGER,
+            question TEXT,
+            key TEXT,
+            value TEXT
+        )""")
+    con.execute(f'CREATE INDEX {quote(f"{RESERVED}_index_{survey}_kv_key")} ON {kv_table} (key)')
+
+
+# insert csv rows (lists of str) into survey tables, numbered from `start`
+def insert_rows(con, survey, header, rows, start):
+    table = quote(survey)
+    kv_table = quote(f'{survey}_kv')
+    placeholders = ', '.join('?' for _ in range(len(header)+1))
+    n = 0
+    kv = []
+    batch = []
+    for n, row in enumerate(rows, start=start):
+        # pad or trim ragged rows to the header
+        row = (row + ['']*len(header))[:len(header)]
+        batch.append([n] + row)
+        # explode key-value answers, which bag stores as json objects
+        for question, cell in zip(header, row):
+            if not cell.startswith('{'):
+                continue
+            try:
+                d = json.loads(cell)
+            except ValueError:
+                continue
+            if isinstance(d, dict):
+                kv.extend((n, question, k, str(v)) for k, v in d.items())
+        if len(batch) >= 10000:
+            con.executemany(f'INSERT INTO {table} VALUES ({placeholders})', batch)
+            con.executemany(f'INSERT INTO {kv_table} VALUES (?, ?, ?, ?)', kv)
+            batch, kv = [], []
+    con.executemany(f'INSERT INTO {table} VALUES ({placeholders})', batch)
+    con.executemany(f'INSERT INTO {kv_table} VALUES (?, ?, ?, ?)', kv)
+    return max(n, start-1)
+
+
+# decoded lines of binary file f, adding each to hash h as it is read
+def hashed_lines(f, h):
+    for line in f:
+        h.update(line)
+        yield line.decode()
+
+
+# bring a single survey's tables up to date with its csv
+def refresh_survey(con, survey, csv_path):
+    stat = os.stat(csv_path)
+    record = con.execute(
+            f'SELECT size, mtime, offset, hash, header, rows FROM {FILES_TABLE} WHERE survey = ?',
+            (survey,)
+    ).fetchone()
+
+    # unchanged since last refresh
+    if record and record[0] == stat.st_size and record[1] == stat.st_mtime:
+        return
+
+    with open(csv_path, 'rb') as f:
+        # check whether the file was only appended to since last refresh:
+        # everything up to the last ingested offset hashes the same
+        h = hashlib.sha256()
+        appended = False
+        if record and stat.st_size >= record[2]:
+            _, _, offset, digest, header, rows = record
+            remaining = offset
+            while remaining > 0:
+                chunk = f.read(min(remaining, 2**20))
+                if not chunk:
+                    break
+                h.update(chunk)
+                remaining -= len(chunk)
+            appended = h.hexdigest() == digest
+
+        # read csv line by line rather than loading the whole file
+        if appended:
+            header = json.loads(header)
+            f.seek(offset)
+            reader = csv.reader(hashed_lines(f, h))
+            rows = insert_rows(con, survey, header, reader, rows+1)
+        else:
+            h = hashlib.sha256()
+            f.seek(0)
+            reader = csv.reader(hashed_lines(f, h))
+            header = next(reader, [])
+            create_tables(con, survey, header)
+            rows = insert_rows(con, survey, header, reader, 1)
+
+        # remember where we stopped, and the hash of everything before it
+        offset = f.tell()
+
+    con.execute(
+            f'INSERT OR REPLACE INTO {FILES_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (survey, stat.st_size, stat.st_mtime, offset, h.hexdigest(), json.dumps(header), rows)
+    )
+
+
+# bring the whole index up to date with ./data/*.csv
+def refresh(con):
+    surveys = {}
+    for csv_path in glob.glob(f'{config.path}/data/*.csv'):
+        survey = os.path.splitext(os.path.basename(csv_path))[0]
+        surveys[survey] = csv_path
+
+    # skip surveys whose tables would clash with bookkeeping or with the
+    # key-value table of another survey; table names are case-insensitive, so
+    # of surveys differing only in case, keep the one already indexed
+    indexed = {s for (s,) in con.execute(f'SELECT survey FROM {FILES_TABLE}')}
+    seen = {}
+    for survey in sorted(surveys, key=lambda s: (s not in indexed, s)):
+        if survey.lower() in seen:
+            print(f'warning: not indexing survey {survey}, name clashes with survey {seen[survey.lower()]} (names are case-insensitive)', file=sys.stderr)
+            del surveys[survey]
+            continue
+        elif survey.lower().startswith(RESERVED):
+            print(f'warning: not indexing survey {survey}, names starting with {RESERVED} are reserved', file=sys.stderr)
+            del surveys[survey]
+        elif survey.lower().endswith('_kv') and survey[:-3].lower() in map(str.lower, surveys):
+            print(f'warning: not indexing survey {survey}, name clashes with key-value table of survey {survey[:-3]}', file=sys.stderr)
+            del surveys[survey]
+        seen[survey.lower()] = survey
+
+    # drop surveys whose data file is gone or is now skipped, leaving any
+    # table that now belongs to another survey
+    owned = {s.lower() for s in surveys} | {f'{s}_kv'.lower() for s in surveys}
+    with con:
+        for survey in indexed:
+            if survey not in surveys:
+                for table in [survey, f'{survey}_kv']:
+                    if table.lower() not in owned:
+                        con.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+                con.execute(f'DELETE FROM {FILES_TABLE} WHERE survey = ?', (survey,))
+
+    for survey, csv_path in surveys.items():
+        with con:
+            refresh_survey(con, survey, csv_path)
+
+
+# refresh index and run a query, returning column names and result rows
+def query(sql):
+    con = connect()
+    try:
+        refresh(con)
+        cursor = con.execute(sql)
+        columns = [c[0] for c in cursor.description or []]
+        rows = cursor.fetchall()
+    finally:
+        con.close()
+    return columns, rows
+
+
+# format query results as a plain text table
+def format_table(columns, rows):
+    rows = [['' if v is None else str(v) for v in row] for row in rows]
+    widths = [max([len(c)] + [len(row[i]) for row in rows]) for i, c in enumerate(columns)]
+    lines = ['  '.join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append('  '.join('-'*w for w in widths))
+    lines.extend('  '.join(v.ljust(w) for v, w in zip(row, widths)) for row in rows)
+    return '\n'.join(lines)
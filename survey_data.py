@@ -0,0 +1,69 @@
+import pandas as pd
+import json
+import datetime
+import re
+
+# load survey data file as str dataframe, adding any columns missing for spec
+def load_data(data_path, spec):
+    try:
+        data = pd.read_csv(
+                data_path,
+                dtype=str, # use str datatype to avoid type inference changing things
+                na_values=[],
+                keep_default_na=False
+        )
+    except FileNotFoundError:
+        empty_data = {k:[] for k in spec['questions'].keys()}
+        data = pd.DataFrame(empty_data).astype(str)
+
+    # check if there are new questions
+    for q in spec['questions'].keys():
+        if q not in data:
+            data[q] = ['' for _ in range(data.shape[0])]
+    # check if there are date/time columns
+    for q in ['date', 'time']:
+        if q not in data:
+            data[q] = [None for _ in range(data.shape[0])]
+
+    return data
+
+# write survey data file
+def save_data(data, data_path):
+    data.to_csv(data_path, index=False)
+
+# build list of options for question `name` from its option spec
+def build_options(data, name, option_spec):
+    # check for __past_n__ option
+    past_n = next(
+                filter(
+                    lambda s: re.match(r'__past_\d+__', s),
+                    option_spec),
+                None)
+    # list past answers as options
+    if '__past__' in option_spec:
+        options = data[name].iloc[::-1].unique()
+    # or answers from past n days
+    elif past_n and not data.empty: # empty data breaks .loc line
+        # NB past_n = '__past_XX__' for some digits XX
+        # so past_n.split('_') = ['', '', 'past', 'XX', '', '']
+        n = int(past_n.split('_')[3])
+        cutoff = datetime.date.today() - datetime.timedelta(days=n)
+        past_n_rows = data.loc[data['date'] > cutoff.isoformat()]
+        options = past_n_rows[name].iloc[::-1].unique()
+    # or past words
+    elif '__past_words__' in option_spec:
+        options = data[name].iloc[::-1]
+        options = ' '.join(options).split()
+        options = pd.Series(options).unique()
+    # or specified options
+    elif len(option_spec) > 0:
+        # ignore double underscored options
+        options = [op for op in option_spec if '__' not in op]
+    else:
+        options = []
+    return options
+
+# past answers to key-value question `name`, one column per key
+def past_key_values(data, name):
+    past_dicts = [json.loads(s) for s in data[name] if s]
+    return pd.DataFrame(past_dicts)
@@ -3,94 +3,82 @@ import subprocess
 import os
 import pandas as pd
 import config
+from profiling import span, timed
 
-def sync(survey, direction=None):
-    local_path = f'{config.path}/data/{survey}.csv'
-    remote_path = f'{config.remote}/{survey}.csv'
-
-    # if direction is up, copy up and return
-    if direction == 'up':
+# run rclone command quietly, raising CalledProcessError on failure
+def rclone(command):
+    with span(f'sync.rclone {command.split()[0]}'):
         subprocess.run(
-                f'rclone copy {local_path} {config.remote}',
+                f'rclone {command}',
                 shell=True,
                 check=True,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
         )
+
+# combine local and remote survey data
+@timed('sync.merge')
+def merge(local_data, remote_data):
+    # combine dataframes by concatenating and dropping duplicates
+    data = pd.concat((local_data, remote_data), ignore_index=True)
+    data = data.drop_duplicates()
+    # rough check that no local data was destroyed
+    assert len(data)>=len(local_data), 'sync aborted: too many rows dropped'
+    # sort by date and time for cleanliness
+    data = data.sort_values(by=['date','time'], na_position='first')
+    return data
+
+@timed('sync')
+def sync(survey, direction=None):
+    local_path = f'{config.path}/data/{survey}.csv'
+    remote_path = f'{config.remote}/{survey}.csv'
+
+    # if direction is up, copy up and return
+    if direction == 'up':
+        rclone(f'copy {local_path} {config.remote}')
         return
 
     # if direction is down, copy down and return
     if direction == 'down':
-        subprocess.run(
-                f'rclone copy {remote_path} {config.path}/data',
-                shell=True,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-        )
+        rclone(f'copy {remote_path} {config.path}/data')
         return
 
     # check if remote file exists; if not, copy up and return
     try:
-        subprocess.run(
-                f'rclone lsf {remote_path}',
-                shell=True,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-        )
+        rclone(f'lsf {remote_path}')
     except subprocess.CalledProcessError as e:
         # return code 3 means not found
         if e.returncode == 3:
-            subprocess.run(
-                    f'rclone copy {local_path} {config.remote}',
-                    shell=True,
-                    check=True,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-            )
+            rclone(f'copy {local_path} {config.remote}')
             return
         else:
             raise
-            
+
 
     # download remote data, load remote data and local data
-    subprocess.run(
-            f'rclone copy {remote_path} {config.path}/data/tmp',
-            shell=True,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-    )
-    remote_data = pd.read_csv(
-            f'{config.path}/data/tmp/{survey}.csv',
-            na_values=[],
-            keep_default_na=False,
-            dtype=str, # load as str to avoid type conflict in drop_duplicates
-    )
-    local_data = pd.read_csv(
-            local_path,
-            na_values=[],
-            keep_default_na=False,
-            dtype=str, # load as str to avoid type conflict in drop_duplicates
-    )
+    rclone(f'copy {remote_path} {config.path}/data/tmp')
+    with span('sync.read remote') as s:
+        remote_data = pd.read_csv(
+                f'{config.path}/data/tmp/{survey}.csv',
+                na_values=[],
+                keep_default_na=False,
+                dtype=str, # load as str to avoid type conflict in drop_duplicates
+        )
+        s.rows = len(remote_data)
+    with span('sync.read local') as s:
+        local_data = pd.read_csv(
+                local_path,
+                na_values=[],
+                keep_default_na=False,
+                dtype=str, # load as str to avoid type conflict in drop_duplicates
+        )
+        s.rows = len(local_data)
 
-    # combine dataframes by concatenating and dropping duplicates
-    data = pd.concat((local_data, remote_data), ignore_index=True)
-    data = data.drop_duplicates()
-    # rough check that no local data was destroyed
-    assert len(data)>=len(local_data), 'sync aborted: too many rows dropped'
-    # sort by date and time for cleanliness
-    data = data.sort_values(by=['date','time'], na_position='first')
+    data = merge(local_data, remote_data)
 
     # write data to local, copy to remote
-    data.to_csv(local_path, index=False)
-    subprocess.run(
-            f'rclone copy {local_path} {config.remote}',
-            shell=True,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-    )
+    with span('sync.write', rows=len(data)):
+        data.to_csv(local_path, index=False)
+    rclone(f'copy {local_path} {config.remote}')
     # delete temp file
     os.remove(f'{config.path}/data/tmp/{survey}.csv')